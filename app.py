@@ -1,24 +1,39 @@
-from flask import Flask, render_template_string, send_from_directory
+from flask import Flask, Response, abort, request
 import os
+import gzip
+import hashlib
+import shutil
+import subprocess
 from dotenv import load_dotenv
 
+try:
+    import brotli
+except ImportError:
+    # Optional: fall back to gzip-only compression
+    brotli = None
+
 load_dotenv()
 
 app = Flask(__name__)
 
-@app.route('/')
-def index():
-    # Read App.jsx content
-    try:
-        with open('frontend/App.jsx', 'r') as f:
-            app_jsx_content = f.read()
-    except FileNotFoundError:
-        app_jsx_content = "// App.jsx not found"
+# --- Frontend Delivery Configuration ---
+# In production the JSX is compiled once (at image build or startup) and the rendered page is cached in memory.
+PRODUCTION = os.getenv("APP_ENV", "development") == "production"
+FRONTEND_SOURCE = 'frontend/App.jsx'
+FRONTEND_BUILD = 'frontend/build/App.js'
+# Hashed assets never change under the same URL, so browsers may cache them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# The HTML carries runtime config, so browsers must revalidate it (cheaply, via ETag)
+HTML_CACHE_CONTROL = "no-cache"
 
-    # Remove export default for browser compatibility
-    app_jsx_content = app_jsx_content.replace('export default App;', '')
 
-    html = f"""
+def render_index_html(body_scripts, use_babel):
+    """Renders the page shell around the given app bootstrap script(s)."""
+    babel_script = (
+        '<!-- Babel for JSX -->\n    <script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>'
+        if use_babel else ''
+    )
+    return f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -26,7 +41,7 @@ def index():
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>TicketScout</title>
     <script src="https://cdn.tailwindcss.com"></script>
-    
+
     <!-- Import Map for Firebase and React -->
     <script type="importmap">
     {{
@@ -39,10 +54,9 @@ def index():
       }}
     }}
     </script>
-    
-    <!-- Babel for JSX -->
-    <script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>
-    
+
+    {babel_script}
+
     <!-- Fonts: Space Grotesk & Space Mono for that technical/industrial feel -->
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
@@ -74,20 +88,38 @@ def index():
         messagingSenderId: "{os.getenv('FIREBASE_MESSAGING_SENDER_ID', 'YOUR_SENDER_ID')}",
         appId: "{os.getenv('FIREBASE_APP_ID', 'YOUR_APP_ID')}"
       }};
-      window.__initial_auth_token = null; 
+      window.__initial_auth_token = null;
     </script>
 </head>
 <body>
     <div id="root"></div>
-    
+    {body_scripts}
+</body>
+</html>
+"""
+
+
+def render_babel_html():
+    """Development page: ships raw JSX and compiles it in the browser with @babel/standalone."""
+    # Read App.jsx content
+    try:
+        with open(FRONTEND_SOURCE, 'r') as f:
+            app_jsx_content = f.read()
+    except FileNotFoundError:
+        app_jsx_content = "// App.jsx not found"
+
+    # Remove export default for browser compatibility
+    app_jsx_content = app_jsx_content.replace('export default App;', '')
+
+    return render_index_html(f"""
     <script type="text/babel" data-type="module">
       console.log("Script starting...");
       import {{ createRoot }} from 'react-dom/client';
       console.log("React DOM imported");
-      
+
       // Injected App.jsx content (It contains its own imports)
       {app_jsx_content}
-      
+
       try {{
           console.log("Mounting React App...");
           const root = createRoot(document.getElementById('root'));
@@ -97,11 +129,134 @@ def index():
           console.error("Render error:", e);
           document.body.innerHTML += '<div style="color:red">Render Error: ' + e.message + '</div>';
       }}
-    </script>
-</body>
-</html>
-"""
-    return html
+    </script>""", use_babel=True)
+
+
+def render_compiled_html(bundle_url):
+    """Production page: imports the precompiled App bundle, no in-browser compilation."""
+    return render_index_html(f"""
+    <link rel="modulepreload" href="{bundle_url}">
+    <script type="module">
+      import React from 'react';
+      import {{ createRoot }} from 'react-dom/client';
+      import App from '{bundle_url}';
+
+      try {{
+          createRoot(document.getElementById('root')).render(React.createElement(App));
+      }} catch (e) {{
+          console.error("Render error:", e);
+          document.body.innerHTML += '<div style="color:red">Render Error: ' + e.message + '</div>';
+      }}
+    </script>""", use_babel=False)
+
+
+def compile_frontend():
+    """
+    Returns the compiled App bundle (JS source), compiling App.jsx with esbuild if the
+    build output is missing or stale. Returns None if no compiled bundle is available.
+    """
+    build_is_fresh = (
+        os.path.exists(FRONTEND_BUILD) and (
+            not os.path.exists(FRONTEND_SOURCE)
+            or os.path.getmtime(FRONTEND_BUILD) >= os.path.getmtime(FRONTEND_SOURCE)
+        )
+    )
+
+    if not build_is_fresh:
+        esbuild = shutil.which('esbuild')
+        if not esbuild:
+            print(f"WARNING: {FRONTEND_BUILD} missing or stale and esbuild not found; serving in-browser Babel build.")
+            return None
+        try:
+            os.makedirs(os.path.dirname(FRONTEND_BUILD), exist_ok=True)
+            subprocess.run(
+                [esbuild, FRONTEND_SOURCE, '--loader:.jsx=jsx', '--format=esm', '--minify', f'--outfile={FRONTEND_BUILD}'],
+                check=True,
+            )
+            print(f"Compiled {FRONTEND_SOURCE} -> {FRONTEND_BUILD}")
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"WARNING: esbuild failed ({e}); serving in-browser Babel build.")
+            return None
+
+    with open(FRONTEND_BUILD, 'r') as f:
+        return f.read()
+
+
+class CachedAsset:
+    """
+    An immutable response body, precompressed once. Each content-coding gets its own strong
+    content-hash ETag (suffixed with the coding), so caches never revalidate one encoding
+    with another's validator.
+    """
+
+    def __init__(self, body, content_type, cache_control):
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(self.body).hexdigest()
+        self.etag = self.digest[:32]
+        self.encodings = {'gzip': gzip.compress(self.body, compresslevel=9)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(self.body, quality=11)
+
+    def negotiate(self):
+        """Returns (content_coding or None, body) for the current request."""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encodings and request.accept_encodings[encoding]:
+                return encoding, self.encodings[encoding]
+        return None, self.body
+
+    def to_response(self):
+        encoding, body = self.negotiate()
+        etag = f"{self.etag}-{encoding}" if encoding else self.etag
+
+        response = Response(status=200, content_type=self.content_type)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = self.cache_control
+        response.vary.add('Accept-Encoding')
+
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+
+        response.set_data(body)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def build_production_assets():
+    """Compiles the frontend once and renders/compresses every production response up front."""
+    bundle_source = compile_frontend()
+    if bundle_source is None:
+        return CachedAsset(render_babel_html(), 'text/html; charset=utf-8', HTML_CACHE_CONTROL), {}
+
+    bundle = CachedAsset(bundle_source, 'application/javascript; charset=utf-8', IMMUTABLE_CACHE_CONTROL)
+    bundle_name = f"app.{bundle.digest[:12]}.js"
+    html = CachedAsset(render_compiled_html(f"/assets/{bundle_name}"), 'text/html; charset=utf-8', HTML_CACHE_CONTROL)
+    return html, {bundle_name: bundle}
+
+
+if PRODUCTION:
+    INDEX_ASSET, STATIC_ASSETS = build_production_assets()
+else:
+    INDEX_ASSET, STATIC_ASSETS = None, {}
+
+
+@app.route('/')
+def index():
+    if INDEX_ASSET is not None:
+        return INDEX_ASSET.to_response()
+    # Development: re-read App.jsx on every request so edits show up on refresh
+    return render_babel_html()
+
+
+@app.route('/assets/<name>')
+def static_asset(name):
+    asset = STATIC_ASSETS.get(name)
+    if asset is None:
+        abort(404)
+    return asset.to_response()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=8080)
+    app.run(debug=not PRODUCTION, host='0.0.0.0', port=8080)
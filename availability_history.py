@@ -0,0 +1,335 @@
+import os
+import sys
+import time
+import zlib
+import struct
+from array import array
+from datetime import datetime, timezone
+
+# --- Availability History Configuration ---
+HISTORY_COLLECTION = os.getenv("HISTORY_COLLECTION", "worker_availability_history")
+# The buffer is flushed at the end of every scan, or earlier once it holds this many samples
+HISTORY_BLOCK_SAMPLES = int(os.getenv("HISTORY_BLOCK_SAMPLES", "5000"))
+# Blocks older than this many days are merged into coarser, per-day blocks
+HISTORY_DOWNSAMPLE_AFTER_DAYS = int(os.getenv("HISTORY_DOWNSAMPLE_AFTER_DAYS", "7"))
+# Bucket width (seconds) used for downsampled blocks; must be coarser than the scan interval to reduce data
+HISTORY_DOWNSAMPLE_RESOLUTION = int(os.getenv("HISTORY_DOWNSAMPLE_RESOLUTION", "21600"))
+# Downsampled days are split into several blocks of at most this many encoded bytes (Firestore caps documents at 1 MiB)
+HISTORY_BLOCK_MAX_BYTES = int(os.getenv("HISTORY_BLOCK_MAX_BYTES", "524288"))
+
+# Status strings are stored as small integers. Append-only: never renumber existing codes.
+STATUS_CODES = {
+    'UNKNOWN': 0,
+    'TICKETS_NOT_AVAILABLE': 1,
+    'FEW_TICKETS_LEFT': 2,
+    'TICKETS_AVAILABLE': 3,
+    'QUEUE_REDIRECT': 4,
+    'FORBIDDEN': 5,
+    'PROXY_ERROR': 6,
+    'RATE_LIMIT_ERROR': 7,
+    'API_ERROR': 8,
+    'UNKNOWN_ERROR': 9,
+}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+# Prices are stored as integer cents; this sentinel marks "price unknown"
+NO_PRICE = -1
+
+# Firestore allows at most 500 writes per batch
+HISTORY_DELETE_BATCH_SIZE = 450
+
+_RUN_HEADER = struct.Struct('<I')
+_DAY_SECONDS = 86400
+
+
+def to_cents(price):
+    return NO_PRICE if price is None else int(round(float(price) * 100))
+
+
+def to_epoch(iso_timestamp):
+    """Converts the worker's ISO 'last_checked' timestamp to integer epoch seconds."""
+    if not iso_timestamp:
+        return int(time.time())
+    return int(datetime.fromisoformat(iso_timestamp).timestamp())
+
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def run_length_encode(samples):
+    """
+    Collapses time-ordered samples (epoch, status_code, min_cents, max_cents) into runs of
+    identical (status, price) readings: [start, end, count, status, min_cents, max_cents].
+    """
+    runs = []
+    for epoch, status_code, min_cents, max_cents in samples:
+        if runs and runs[-1][3:] == [status_code, min_cents, max_cents]:
+            runs[-1][1] = epoch
+            runs[-1][2] += 1
+        else:
+            runs.append([epoch, epoch, 1, status_code, min_cents, max_cents])
+    return runs
+
+
+def encode_runs(runs, block_start):
+    """
+    Packs runs into a compact, zlib-compressed columnar byte string. Run starts are stored as
+    deltas from the previous run (the first from block_start), run ends as durations.
+    """
+    starts, durations, counts = array('I'), array('I'), array('I')
+    statuses = array('B')
+    min_prices, max_prices = array('i'), array('i')
+
+    previous_start = block_start
+    for start, end, count, status_code, min_cents, max_cents in runs:
+        starts.append(start - previous_start)
+        durations.append(end - start)
+        counts.append(count)
+        statuses.append(status_code)
+        min_prices.append(min_cents)
+        max_prices.append(max_cents)
+        previous_start = start
+
+    payload = _RUN_HEADER.pack(len(runs)) + b''.join(
+        _little_endian(column) for column in (starts, durations, counts, min_prices, max_prices)
+    ) + statuses.tobytes()
+    return zlib.compress(payload, 9)
+
+
+def decode_runs(blob, block_start):
+    """Inverse of encode_runs: returns a list of [start, end, count, status, min_cents, max_cents]."""
+    payload = zlib.decompress(blob)
+    (count,) = _RUN_HEADER.unpack_from(payload)
+    offset = _RUN_HEADER.size
+    columns = []
+    for typecode in ('I', 'I', 'I', 'i', 'i'):
+        size = array(typecode).itemsize * count
+        columns.append(_from_little_endian(typecode, payload[offset:offset + size]))
+        offset += size
+    statuses = array('B', payload[offset:offset + count])
+    starts, durations, counts, min_prices, max_prices = columns
+
+    runs = []
+    start = block_start
+    for i in range(count):
+        start += starts[i]
+        runs.append([start, start + durations[i], counts[i], statuses[i], min_prices[i], max_prices[i]])
+    return runs
+
+
+class AvailabilityHistory:
+    """
+    In-memory, append-only buffer of availability samples, flushed to Firestore in blocks.
+
+    Each flush writes ONE document holding the run-length-encoded samples of every buffered
+    job, so the history costs one write per block instead of one write per poll. The worker
+    flushes at the end of every scan, so nothing depends on the instance staying warm; a
+    failed flush keeps its samples buffered and they go out with the next one.
+    """
+
+    def __init__(self, block_samples=HISTORY_BLOCK_SAMPLES):
+        self.block_samples = block_samples
+        self._samples = {}
+        self._sample_count = 0
+        self._oldest = None
+
+    def record(self, job_id, availability_data):
+        """Buffers one poll result (the dict returned by check_event_status)."""
+        epoch = to_epoch(availability_data.get('last_checked'))
+        sample = (
+            epoch,
+            STATUS_CODES.get(availability_data.get('status'), STATUS_CODES['UNKNOWN']),
+            to_cents(availability_data.get('priceMin')),
+            to_cents(availability_data.get('priceMax')),
+        )
+        self._samples.setdefault(job_id, []).append(sample)
+        self._sample_count += 1
+        if self._oldest is None or epoch < self._oldest:
+            self._oldest = epoch
+
+    def is_due(self):
+        """True once the buffer is full enough to be written before the scan ends."""
+        return self._sample_count >= self.block_samples
+
+    def flush(self, db):
+        """Writes all buffered samples as a single block document and clears the buffer."""
+        if not self._sample_count:
+            return None
+
+        block_start = self._oldest
+        runs_by_job = {}
+        block_end = block_start
+        for job_id, samples in self._samples.items():
+            samples.sort()
+            runs = run_length_encode(samples)
+            block_end = max(block_end, runs[-1][1])
+            runs_by_job[job_id] = encode_runs(runs, block_start)
+
+        block = {
+            'start': block_start,
+            'end': block_end,
+            'resolution': 0,
+            'sample_count': self._sample_count,
+            'job_ids': sorted(runs_by_job),
+            'runs': runs_by_job,
+        }
+        block_ref = db.collection(HISTORY_COLLECTION).document()
+        block_ref.set(block)
+        print(f"History block {block_ref.id} flushed: {self._sample_count} samples for {len(runs_by_job)} jobs.")
+
+        self._samples = {}
+        self._sample_count = 0
+        self._oldest = None
+        return block_ref.id
+
+
+def downsample_runs(runs, resolution):
+    """
+    Merges runs into fixed-width time buckets (keeping the latest status, the lowest minimum
+    price and the highest maximum price seen in each bucket), then re-run-length-encodes them.
+    """
+    buckets = {}
+    for start, end, count, status_code, min_cents, max_cents in sorted(runs):
+        key = start - start % resolution
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [start, end, count, status_code, min_cents, max_cents]
+            continue
+        bucket[1] = max(bucket[1], end)
+        bucket[2] += count
+        bucket[3] = status_code
+        if min_cents != NO_PRICE:
+            bucket[4] = min_cents if bucket[4] == NO_PRICE else min(bucket[4], min_cents)
+        bucket[5] = max(bucket[5], max_cents)
+
+    merged = []
+    for key in sorted(buckets):
+        bucket = buckets[key]
+        if merged and merged[-1][3:] == bucket[3:]:
+            merged[-1][1] = bucket[1]
+            merged[-1][2] += bucket[2]
+        else:
+            merged.append(bucket)
+    return merged
+
+
+def split_by_size(runs_by_job, block_start, max_bytes=HISTORY_BLOCK_MAX_BYTES):
+    """
+    Splits {job_id: runs} into chunks whose encoded runs (plus the job ID, stored both as a map
+    key and in job_ids) stay under `max_bytes`. A single oversized job still gets its own chunk.
+    """
+    chunk, chunk_bytes = {}, 0
+    for job_id in sorted(runs_by_job):
+        runs = runs_by_job[job_id]
+        size = len(encode_runs(runs, block_start)) + 2 * len(job_id.encode('utf-8')) + 16
+        if chunk and chunk_bytes + size > max_bytes:
+            yield chunk
+            chunk, chunk_bytes = {}, 0
+        chunk[job_id] = runs
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def downsample_history(db, older_than_days=HISTORY_DOWNSAMPLE_AFTER_DAYS, resolution=HISTORY_DOWNSAMPLE_RESOLUTION):
+    """
+    Rewrites raw blocks that ended more than `older_than_days` ago into one coarser block per
+    UTC day, then deletes the originals. Only raw (resolution 0) blocks are read, so the daily
+    run never re-reads the downsampled history it already wrote.
+    """
+    cutoff = int(time.time()) - older_than_days * _DAY_SECONDS
+    # Equality + range on different fields: needs a composite index on (resolution, end)
+    old_blocks = (
+        db.collection(HISTORY_COLLECTION)
+        .where('resolution', '==', 0)
+        .where('end', '<', cutoff)
+        .stream()
+    )
+
+    days = {}
+    for block_doc in old_blocks:
+        block = block_doc.to_dict()
+        day = days.setdefault(block['start'] - block['start'] % _DAY_SECONDS, {'refs': [], 'runs': {}})
+        day['refs'].append(block_doc.reference)
+        for job_id, blob in block.get('runs', {}).items():
+            day['runs'].setdefault(job_id, []).extend(decode_runs(blob, block['start']))
+
+    for day_start, day in sorted(days.items()):
+        merged_by_job = {job_id: downsample_runs(runs, resolution) for job_id, runs in day['runs'].items()}
+
+        # Write the merged blocks first so a failure part-way never loses data, only duplicates it
+        for runs_by_job in split_by_size(merged_by_job, day_start):
+            block_start = min(runs[0][0] for runs in runs_by_job.values())
+            db.collection(HISTORY_COLLECTION).document().set({
+                'start': block_start,
+                'end': max(runs[-1][1] for runs in runs_by_job.values()),
+                'resolution': resolution,
+                'sample_count': sum(run[2] for runs in runs_by_job.values() for run in runs),
+                'job_ids': sorted(runs_by_job),
+                'runs': {job_id: encode_runs(runs, block_start) for job_id, runs in runs_by_job.items()},
+            })
+
+        refs = day['refs']
+        for i in range(0, len(refs), HISTORY_DELETE_BATCH_SIZE):
+            batch = db.batch()
+            for ref in refs[i:i + HISTORY_DELETE_BATCH_SIZE]:
+                batch.delete(ref)
+            batch.commit()
+        print(f"Downsampled {len(day['refs'])} history blocks for day {datetime.fromtimestamp(day_start, timezone.utc).date()}.")
+
+
+def load_history(db, job_id, since=None, until=None):
+    """
+    Returns the availability history of one job as NumPy arrays, ordered by time:
+
+        'start', 'end'             int64 epoch seconds of each run
+        'count'                    uint32 number of polls merged into each run
+        'status'                   uint8 status codes (see STATUS_CODES / STATUS_NAMES)
+        'price_min', 'price_max'   float64 dollars, NaN where the price was unknown
+
+    Requires numpy (analysis-only dependency, not needed by the worker).
+    """
+    import numpy as np
+
+    blocks = db.collection(HISTORY_COLLECTION).where('job_ids', 'array_contains', job_id)
+    if since is not None:
+        blocks = blocks.where('end', '>=', since)
+
+    runs = []
+    for block_doc in blocks.stream():
+        block = block_doc.to_dict()
+        if until is not None and block['start'] > until:
+            continue
+        runs.extend(decode_runs(block['runs'][job_id], block['start']))
+    runs.sort()
+
+    table = np.array(runs, dtype=np.int64).reshape(-1, 6)
+    if since is not None:
+        table = table[table[:, 1] >= since]
+    if until is not None:
+        table = table[table[:, 0] <= until]
+
+    price_min = table[:, 4].astype(np.float64) / 100
+    price_max = table[:, 5].astype(np.float64) / 100
+    price_min[table[:, 4] == NO_PRICE] = np.nan
+    price_max[table[:, 5] == NO_PRICE] = np.nan
+
+    return {
+        'start': table[:, 0],
+        'end': table[:, 1],
+        'count': table[:, 2].astype(np.uint32),
+        'status': table[:, 3].astype(np.uint8),
+        'price_min': price_min,
+        'price_max': price_max,
+    }
@@ -0,0 +1,245 @@
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+# --- Compaction Configuration ---
+MOCK_ROOT_COLLECTION = os.getenv("MOCK_ROOT_COLLECTION", "worker_monitor_jobs")
+ARCHIVE_COLLECTION = os.getenv("ARCHIVE_COLLECTION", "worker_monitor_jobs_archive")
+MAINTENANCE_COLLECTION = os.getenv("MAINTENANCE_COLLECTION", "worker_maintenance")
+# 'archive' copies jobs to ARCHIVE_COLLECTION before removing them; 'delete' just removes them
+COMPACTION_MODE = os.getenv("COMPACTION_MODE", "archive")
+# COMPLETE jobs are kept in the hot collection for this many days after their notification
+COMPLETE_RETENTION_DAYS = int(os.getenv("COMPLETE_RETENTION_DAYS", "7"))
+# ACTIVE jobs created longer ago than this are considered stale
+STALE_JOB_RETENTION_DAYS = int(os.getenv("STALE_JOB_RETENTION_DAYS", "180"))
+# Jobs per page; archive mode costs 2 writes per job (+1 checkpoint), within Firestore's 500-write batch limit
+COMPACTION_PAGE_SIZE = int(os.getenv("COMPACTION_PAGE_SIZE", "200"))
+# Stop (and resume on the next invocation) after this many seconds
+COMPACTION_TIME_BUDGET_SECONDS = int(os.getenv("COMPACTION_TIME_BUDGET_SECONDS", "240"))
+
+# --- Worker Lease (scan/compaction mutual exclusion) ---
+LOCK_DOCUMENT = "worker_lock"
+CHECKPOINT_DOCUMENT = "compaction_checkpoint"
+# The scan holds the lease for its whole run, renewing it as it goes; compaction only for one page at a time
+SCAN_LEASE_SECONDS = int(os.getenv("SCAN_LEASE_SECONDS", "540"))
+SCAN_LEASE_RENEW_SECONDS = SCAN_LEASE_SECONDS // 3
+COMPACTION_LEASE_SECONDS = 60
+LEASE_POLL_SECONDS = 2
+
+# Compaction phases, processed in order
+PHASES = ['COMPLETE', 'ACTIVE']
+
+
+def get_firestore():
+    """Returns the firebase_admin.firestore module, imported on first use so module load stays cheap."""
+    from firebase_admin import firestore
+    return firestore
+
+
+def acquire_lease(db, holder, ttl_seconds, wait_seconds=0, priority=False):
+    """
+    Takes the shared worker lease for `holder`, waiting up to `wait_seconds` for an existing,
+    unexpired lease to be released. Returns a token to pass to release_lease, or None.
+
+    A `priority` caller (the scan) that finds the lease held leaves a waiting marker on the lock
+    document; non-priority callers (compaction pages) refuse the lease while that marker is
+    live, so the lease is handed to the waiting scan instead of being retaken page after page.
+    """
+    firestore = get_firestore()
+
+    lock_ref = db.collection(MAINTENANCE_COLLECTION).document(LOCK_DOCUMENT)
+    token = uuid.uuid4().hex
+    deadline = time.time() + wait_seconds
+
+    @firestore.transactional
+    def try_acquire(transaction):
+        snapshot = lock_ref.get(transaction=transaction)
+        lock = snapshot.to_dict() if snapshot.exists else {}
+        now = time.time()
+        if lock.get('expires_at', 0) > now:
+            if priority and lock.get('waiting_until', 0) < deadline:
+                transaction.update(lock_ref, {'waiting': holder, 'waiting_until': deadline})
+            return False
+        if not priority and lock.get('waiting_until', 0) > now:
+            return False
+        transaction.set(lock_ref, {'holder': holder, 'token': token, 'expires_at': now + ttl_seconds})
+        return True
+
+    while True:
+        if try_acquire(db.transaction()):
+            return token
+        if time.time() >= deadline:
+            return None
+        time.sleep(LEASE_POLL_SECONDS)
+
+
+def renew_lease(db, token, ttl_seconds):
+    """
+    Extends the shared worker lease by `ttl_seconds` from now if it is still held under `token`.
+    Returns False if the lease expired and was taken by someone else (or released).
+    """
+    firestore = get_firestore()
+
+    lock_ref = db.collection(MAINTENANCE_COLLECTION).document(LOCK_DOCUMENT)
+
+    @firestore.transactional
+    def try_renew(transaction):
+        snapshot = lock_ref.get(transaction=transaction)
+        if not snapshot.exists or snapshot.to_dict().get('token') != token:
+            return False
+        transaction.update(lock_ref, {'expires_at': time.time() + ttl_seconds})
+        return True
+
+    return try_renew(db.transaction())
+
+
+def release_lease(db, token):
+    """Releases the shared worker lease if it is still held under `token`, keeping any waiting marker."""
+    if not token:
+        return
+    firestore = get_firestore()
+
+    lock_ref = db.collection(MAINTENANCE_COLLECTION).document(LOCK_DOCUMENT)
+
+    @firestore.transactional
+    def try_release(transaction):
+        snapshot = lock_ref.get(transaction=transaction)
+        if snapshot.exists and snapshot.to_dict().get('token') == token:
+            transaction.update(lock_ref, {'holder': None, 'token': None, 'expires_at': 0})
+
+    try_release(db.transaction())
+
+
+def _older_than(value, cutoff):
+    # Firestore timestamps come back as timezone-aware datetimes; anything else is treated as unknown
+    return isinstance(value, datetime) and value < cutoff
+
+
+def find_orphaned_job_ids(db, job_docs):
+    """Returns the IDs of jobs whose source document (in the user's collection) was archived/deleted by the user."""
+    refs_by_path = {}
+    for job_doc in job_docs:
+        source_path = job_doc.to_dict().get('original_source_path')
+        if source_path:
+            refs_by_path.setdefault(source_path, []).append(job_doc.id)
+    if not refs_by_path:
+        return set()
+
+    existing = {
+        snapshot.reference.path
+        for snapshot in db.get_all([db.document(path) for path in refs_by_path])
+        if snapshot.exists
+    }
+    return {job_id for path, job_ids in refs_by_path.items() if path not in existing for job_id in job_ids}
+
+
+def compaction_reason(phase, job_data, orphaned, now):
+    """Returns why a job should leave the hot collection ('COMPLETE', 'STALE', 'ORPHANED'), or None to keep it."""
+    if phase == 'COMPLETE':
+        completed_at = job_data.get('notificationSentAt')
+        if completed_at is None or _older_than(completed_at, now - timedelta(days=COMPLETE_RETENTION_DAYS)):
+            return 'COMPLETE'
+        return None
+
+    if orphaned:
+        return 'ORPHANED'
+    created_at = job_data.get('createdAt') or job_data.get('synced_at')
+    if _older_than(created_at, now - timedelta(days=STALE_JOB_RETENTION_DAYS)):
+        return 'STALE'
+    return None
+
+
+def compact_page(db, phase, cursor, checkpoint_ref):
+    """
+    Compacts one page of `phase` jobs after document ID `cursor`. The moves and the advanced
+    checkpoint are committed in the same batch, so a crash never loses or repeats a page.
+    Returns (next_cursor or None when the phase is exhausted, jobs_compacted).
+    """
+    firestore = get_firestore()
+
+    jobs_collection = db.collection(MOCK_ROOT_COLLECTION)
+    page_query = (
+        jobs_collection
+        .where('status', '==', phase)
+        .order_by('__name__')
+        .limit(COMPACTION_PAGE_SIZE)
+    )
+    if cursor:
+        # Value-based cursor: still valid after the cursor document itself was moved out
+        page_query = page_query.start_after({'__name__': cursor})
+
+    job_docs = list(page_query.stream())
+    if not job_docs:
+        return None, 0
+
+    orphaned_ids = find_orphaned_job_ids(db, job_docs) if phase == 'ACTIVE' else set()
+    now = datetime.now(timezone.utc)
+
+    batch = db.batch()
+    compacted = 0
+    for job_doc in job_docs:
+        job_data = job_doc.to_dict()
+        reason = compaction_reason(phase, job_data, job_doc.id in orphaned_ids, now)
+        if reason is None:
+            continue
+        if COMPACTION_MODE == 'archive':
+            job_data['archived_at'] = firestore.SERVER_TIMESTAMP
+            job_data['archive_reason'] = reason
+            batch.set(db.collection(ARCHIVE_COLLECTION).document(job_doc.id), job_data)
+        batch.delete(job_doc.reference)
+        compacted += 1
+
+    next_cursor = job_docs[-1].id if len(job_docs) == COMPACTION_PAGE_SIZE else None
+    batch.set(checkpoint_ref, {
+        'phase': phase,
+        'cursor': next_cursor,
+        'updated_at': firestore.SERVER_TIMESTAMP,
+    })
+    batch.commit()
+    return next_cursor, compacted
+
+
+def compact_jobs(db):
+    """
+    Moves COMPLETE (past retention), stale and orphaned jobs out of the hot worker collection,
+    one page per batch. Progress is checkpointed after every page, so a run that hits its time
+    budget, loses the lease to a scan, or crashes resumes where it stopped on the next call.
+    Returns True when every phase is finished, False when work remains.
+    """
+    firestore = get_firestore()
+
+    checkpoint_ref = db.collection(MAINTENANCE_COLLECTION).document(CHECKPOINT_DOCUMENT)
+    checkpoint = checkpoint_ref.get()
+    state = checkpoint.to_dict() if checkpoint.exists else {}
+    phase = state.get('phase', PHASES[0])
+    cursor = state.get('cursor')
+
+    deadline = time.time() + COMPACTION_TIME_BUDGET_SECONDS
+    total_compacted = 0
+
+    while True:
+        if time.time() >= deadline:
+            print(f"Compaction time budget reached after {total_compacted} jobs; will resume at {phase}/{cursor}.")
+            return False
+
+        # Take the lease per page; a scan waiting on it (see acquire_lease) makes this fail, so
+        # the scan is never blocked for more than one page
+        token = acquire_lease(db, 'compaction', COMPACTION_LEASE_SECONDS)
+        if token is None:
+            print(f"Scan in progress or waiting; compaction paused after {total_compacted} jobs at {phase}/{cursor}.")
+            return False
+        try:
+            cursor, compacted = compact_page(db, phase, cursor, checkpoint_ref)
+        finally:
+            release_lease(db, token)
+        total_compacted += compacted
+
+        if cursor is None:
+            next_index = PHASES.index(phase) + 1
+            if next_index == len(PHASES):
+                checkpoint_ref.delete()
+                print(f"Compaction complete: {total_compacted} jobs moved out of {MOCK_ROOT_COLLECTION} this run.")
+                return True
+            phase = PHASES[next_index]
+            checkpoint_ref.set({'phase': phase, 'cursor': None, 'updated_at': firestore.SERVER_TIMESTAMP})
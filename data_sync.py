@@ -1,8 +1,17 @@
 import os
-from google.cloud import firestore
 
-# Initialize Firestore Client
-db = firestore.Client()
+# Firestore Client, created on first use so cold starts don't pay for the SDK import up front
+_db = None
+
+
+def get_db():
+    """Returns the cached Firestore client, importing and creating it on first use."""
+    global _db
+    if _db is None:
+        from google.cloud import firestore
+        _db = firestore.Client()
+    return _db
+
 
 def sync_monitor_job(event, context):
     """
@@ -27,6 +36,9 @@ def sync_monitor_job(event, context):
     print(f"Processing Document ID: {document_id}")
 
     try:
+        from google.cloud import firestore
+        db = get_db()
+
         # Fetch the full document data from the source to ensure we have the latest state
         source_doc_ref = db.document(source_doc_path)
         doc_snapshot = source_doc_ref.get()
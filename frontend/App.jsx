@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef, memo } from 'react';
 import { initializeApp } from "firebase/app";
-import { getFirestore, collection, addDoc, deleteDoc, doc, query, onSnapshot, orderBy, serverTimestamp } from "firebase/firestore";
+import { getFirestore, collection, addDoc, deleteDoc, doc, query, onSnapshot, orderBy, limit, startAfter, endAt, getDocs, serverTimestamp } from "firebase/firestore";
 import { getAuth, signInWithCustomToken, signInAnonymously } from "firebase/auth";
 
 // Initialize Firebase
@@ -9,6 +9,11 @@ const isConfigured = firebaseConfig.projectId && firebaseConfig.projectId !== "Y
 
 let app, db, auth;
 
+// Jobs are read in pages: only the newest page is live, older pages are fetched on demand
+const PAGE_SIZE = 25;
+// Estimated card height (px, incl. gap) used before a card has been measured
+const ESTIMATED_CARD_HEIGHT = 144;
+
 // Mock Data Store for Local Preview
 const mockDb = {
     jobs: [
@@ -67,6 +72,21 @@ if (isConfigured) {
 
 
 
+// --- HELPERS ---
+// Helper for conditional classes
+const cn = (...classes) => classes.filter(Boolean).join(' ');
+
+const parseAvailability = (raw) => {
+    try {
+        return (typeof raw === 'string' ? JSON.parse(raw) : raw) || {};
+    } catch (e) { return {}; }
+};
+
+const snapshotToJobs = (snapshot) => snapshot.docs.map(doc => ({
+    id: doc.id,
+    ...doc.data()
+}));
+
 // --- COMPONENTS ---
 const ConfirmationModal = ({ isOpen, onClose, onConfirm, title, message }) => {
     if (!isOpen) return null;
@@ -100,8 +120,178 @@ const ConfirmationModal = ({ isOpen, onClose, onConfirm, title, message }) => {
     );
 };
 
+// Cards only re-render when the fields they display change, and parse availability once per change
+const JobCard = memo(({ job, onArchive }) => {
+    const availability = useMemo(() => parseAvailability(job.current_availability), [job.current_availability]);
+
+    const isAvailable = availability.status === "TICKETS_AVAILABLE";
+    const isFew = availability.status === "FEW_TICKETS_LEFT";
+
+    return (
+        <div className="border-2 border-black bg-white flex flex-col md:flex-row h-auto md:h-32 transition-transform hover:-translate-y-1 hover:shadow-[4px_4px_0px_0px_rgba(0,0,0,1)]">
+
+            {/* STATUS STRIP */}
+            <div className={cn(
+                "w-full md:w-2 flex-shrink-0 border-b-2 md:border-b-0 md:border-r-2 border-black",
+                isAvailable ? "bg-[#FF4500]" : (isFew ? "bg-yellow-400" : "bg-gray-200")
+            )}></div>
+
+            {/* DATA BLOCK */}
+            <div className="flex-1 p-4 flex flex-col justify-between">
+                <div className="flex justify-between items-start">
+                    <div>
+                        <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Event_Target</div>
+                        <div className="text-xl font-bold uppercase tracking-tight">{job.eventID}</div>
+                    </div>
+                    <div className="flex items-center">
+                        <div className="font-mono text-[10px] border border-black px-1 pt-[2px] uppercase">
+                            {job.mode}
+                        </div>
+                        <button
+                            onClick={() => onArchive(job.id)}
+                            className="font-mono text-[10px] border border-red-500 text-red-500 hover:bg-red-500 hover:text-white px-2 pt-[2px] uppercase transition-colors ml-2"
+                        >
+                            Archive
+                        </button>
+                    </div>
+                </div>
+
+                <div className="flex gap-8 mt-2">
+                    <div>
+                        <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Contact (Email)</div>
+                        <div className="font-mono text-sm">{job.contact}</div>
+                    </div>
+                    <div>
+                        <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Created</div>
+                        <div className="font-mono text-sm">
+                            {job.createdAt?.seconds ? new Date(job.createdAt.seconds * 1000).toLocaleDateString() : 'Just now'}
+                        </div>
+                    </div>
+                </div>
+            </div>
+
+            {/* LIVE METRICS BLOCK */}
+            <div className="w-full md:w-64 border-t-2 md:border-t-0 md:border-l-2 border-black bg-[#F9F9F9] p-4 flex flex-col justify-center relative overflow-hidden">
+                {/* Background Grid Pattern */}
+                <div className="absolute inset-0 opacity-5 pointer-events-none"
+                    style={{ backgroundImage: 'radial-gradient(circle, #000 1px, transparent 1px)', backgroundSize: '10px 10px' }}>
+                </div>
+
+                <div className="relative z-10">
+                    <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Current Status</div>
+                    <div className={cn(
+                        "text-sm font-bold uppercase inline-block border border-black px-2 py-1 mb-2",
+                        job.status === 'ACTIVE' ? "bg-green-500 text-white" : "bg-red-500 text-white"
+                    )}>
+                        {job.status === 'ACTIVE' ? "RUNNING" : "RUN"}
+                    </div>
+
+                    <div className="flex justify-between items-end border-t border-gray-300 pt-2">
+                        <span className="text-[10px] font-bold uppercase text-gray-400">Last Check</span>
+                        <span className="font-mono text-xs">
+                            {availability.last_checked ? new Date(availability.last_checked).toLocaleTimeString([], { hour12: false }) : "--:--:--"}
+                        </span>
+                    </div>
+                </div>
+            </div>
+        </div>
+    );
+}, (prev, next) => (
+    prev.onArchive === next.onArchive &&
+    prev.job.id === next.job.id &&
+    prev.job.eventID === next.job.eventID &&
+    prev.job.contact === next.job.contact &&
+    prev.job.mode === next.job.mode &&
+    prev.job.status === next.job.status &&
+    prev.job.current_availability === next.job.current_availability &&
+    prev.job.createdAt?.seconds === next.job.createdAt?.seconds
+));
+
+// Windowed list: only the cards inside (or near) the scroll viewport are mounted.
+// Card heights vary by breakpoint, so each mounted card is measured and cached by key.
+const VirtualList = ({ items, getKey, renderItem, onEndReached, overscan = 4, gap = 16 }) => {
+    const containerRef = useRef(null);
+    const heights = useRef(new Map());
+    const [scrollTop, setScrollTop] = useState(0);
+    const [viewportHeight, setViewportHeight] = useState(800);
+    const [measureVersion, setMeasureVersion] = useState(0);
+
+    useEffect(() => {
+        const el = containerRef.current;
+        if (!el) return;
+        const onResize = () => setViewportHeight(el.clientHeight);
+        onResize();
+        window.addEventListener('resize', onResize);
+        return () => window.removeEventListener('resize', onResize);
+    }, []);
+
+    // offsets[i] = top of item i; offsets[items.length] = total height
+    const offsets = useMemo(() => {
+        const result = new Array(items.length + 1);
+        result[0] = 0;
+        items.forEach((item, i) => {
+            const height = heights.current.get(getKey(item)) ?? ESTIMATED_CARD_HEIGHT;
+            result[i + 1] = result[i] + height;
+        });
+        return result;
+    }, [items, getKey, measureVersion]);
+
+    // Binary search for the first item whose bottom is below the scroll position
+    let low = 0, high = items.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (offsets[mid + 1] <= scrollTop) low = mid + 1; else high = mid;
+    }
+    const first = Math.max(0, low - overscan);
+    let last = low;
+    while (last < items.length && offsets[last] < scrollTop + viewportHeight) last++;
+    last = Math.min(items.length, last + overscan);
+
+    useEffect(() => {
+        if (items.length > 0 && last >= items.length && onEndReached) onEndReached();
+    }, [last, items.length, onEndReached]);
+
+    const measure = useCallback((key) => (el) => {
+        if (!el) return;
+        const height = el.offsetHeight + gap;
+        if (heights.current.get(key) !== height) {
+            heights.current.set(key, height);
+            setMeasureVersion(v => v + 1);
+        }
+    }, [gap]);
+
+    return (
+        <div
+            ref={containerRef}
+            onScroll={(e) => setScrollTop(e.currentTarget.scrollTop)}
+            className="h-[calc(100vh-14rem)] min-h-[24rem] overflow-y-auto"
+        >
+            <div style={{ height: offsets[items.length], position: 'relative' }}>
+                {items.slice(first, last).map((item, i) => {
+                    const key = getKey(item);
+                    return (
+                        <div key={key} ref={measure(key)} style={{ position: 'absolute', top: offsets[first + i], left: 0, right: 0 }}>
+                            {renderItem(item)}
+                        </div>
+                    );
+                })}
+            </div>
+        </div>
+    );
+};
+
 const App = () => {
-    const [jobs, setJobs] = useState([]);
+    // Newest page (live) + older pages (fetched on demand with cursors)
+    const [headJobs, setHeadJobs] = useState([]);
+    const [headCursor, setHeadCursor] = useState(null);
+    // Last head doc when the first older page was fetched; the head then ends there instead of at PAGE_SIZE
+    const [headAnchor, setHeadAnchor] = useState(null);
+    const [olderJobs, setOlderJobs] = useState([]);
+    const [olderCursor, setOlderCursor] = useState(null);
+    const [hasMore, setHasMore] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
+    // Set when an older page fails to load; stops onEndReached from retrying until the user does
+    const [loadMoreError, setLoadMoreError] = useState(null);
     const [eventId, setEventId] = useState("");
     const [contact, setContact] = useState("");
     const [loading, setLoading] = useState(false);
@@ -128,6 +318,13 @@ const App = () => {
         return unsubscribe;
     }, []);
 
+    useEffect(() => {
+        setHeadAnchor(null);
+        setOlderJobs([]);
+        setOlderCursor(null);
+        setLoadMoreError(null);
+    }, [user]);
+
     useEffect(() => {
         if (!user || !window.__app_id) return;
 
@@ -135,21 +332,48 @@ const App = () => {
             // Requirement: /artifacts/{appId}/users/{userId}/ticket_monitors
             const path = `artifacts/${window.__app_id}/users/${user.uid}/ticket_monitors`;
             console.log("Listening to Firestore Path:", path);
-            const q = query(collection(db, path), orderBy("createdAt", "desc"));
+            // Once older pages are loaded, the head is pinned to the anchor doc: new monitors grow
+            // the head instead of pushing its last doc into the gap before the first older page
+            const q = headAnchor
+                ? query(collection(db, path), orderBy("createdAt", "desc"), endAt(headAnchor))
+                : query(collection(db, path), orderBy("createdAt", "desc"), limit(PAGE_SIZE));
 
             const unsubscribe = onSnapshot(q, (snapshot) => {
-                const jobsData = snapshot.docs.map(doc => ({
-                    id: doc.id,
-                    ...doc.data()
-                }));
-                setJobs(jobsData);
+                setHeadJobs(snapshotToJobs(snapshot));
+                setHeadCursor(snapshot.docs[snapshot.docs.length - 1] || null);
+                if (!headAnchor) setHasMore(snapshot.size === PAGE_SIZE);
             });
             return unsubscribe;
         } else {
             // Mock Subscription
-            return mockDb.subscribe(setJobs);
+            return mockDb.subscribe(setHeadJobs);
         }
-    }, [user]);
+    }, [user, headAnchor]);
+
+    const jobs = useMemo(() => {
+        const headIds = new Set(headJobs.map(job => job.id));
+        return [...headJobs, ...olderJobs.filter(job => !headIds.has(job.id))];
+    }, [headJobs, olderJobs]);
+
+    const loadMore = useCallback(async () => {
+        const cursor = olderCursor || headAnchor || headCursor;
+        if (!isConfigured || !user || !hasMore || loadingMore || loadMoreError || !cursor) return;
+
+        setLoadingMore(true);
+        if (!headAnchor) setHeadAnchor(cursor);
+        try {
+            const path = `artifacts/${window.__app_id}/users/${user.uid}/ticket_monitors`;
+            const q = query(collection(db, path), orderBy("createdAt", "desc"), startAfter(cursor), limit(PAGE_SIZE));
+            const snapshot = await getDocs(q);
+            setOlderJobs(prev => [...prev, ...snapshotToJobs(snapshot)]);
+            setOlderCursor(snapshot.docs[snapshot.docs.length - 1] || cursor);
+            setHasMore(snapshot.size === PAGE_SIZE);
+        } catch (err) {
+            console.error("Error loading older jobs:", err);
+            setLoadMoreError(err);
+        }
+        setLoadingMore(false);
+    }, [user, hasMore, loadingMore, loadMoreError, olderCursor, headAnchor, headCursor]);
 
     const handleSubmit = async (e) => {
         e.preventDefault();
@@ -189,10 +413,13 @@ const App = () => {
         setLoading(false);
     };
 
-    const handleDelete = (jobId) => {
+    const handleDelete = useCallback((jobId) => {
         setJobToDelete(jobId);
         setShowDeleteModal(true);
-    };
+    }, []);
+
+    const getJobKey = useCallback((job) => job.id, []);
+    const renderJob = useCallback((job) => <JobCard job={job} onArchive={handleDelete} />, [handleDelete]);
 
     const confirmDelete = async () => {
         if (!jobToDelete) return;
@@ -200,6 +427,8 @@ const App = () => {
         if (isConfigured) {
             const path = `artifacts/${window.__app_id}/users/${user.uid}/ticket_monitors`;
             await deleteDoc(doc(db, path, jobToDelete));
+            // Older pages are not live, so drop the archived job locally
+            setOlderJobs(prev => prev.filter(job => job.id !== jobToDelete));
         } else {
             mockDb.deleteJob(jobToDelete);
         }
@@ -213,9 +442,6 @@ const App = () => {
     const ACCENT_TEXT = "text-[#FF4500]";
     const ACCENT_BORDER = "border-[#FF4500]";
 
-    // Helper for conditional classes
-    const cn = (...classes) => classes.filter(Boolean).join(' ');
-
     return (
         <div className="min-h-screen bg-[#F4F4F4] text-black selection:bg-[#FF4500] selection:text-white flex flex-col">
 
@@ -315,7 +541,7 @@ const App = () => {
                             <div className="text-right">{isConfigured ? "FIREBASE_V9" : "LOCAL_MOCK"}</div>
 
                             <div className="text-gray-500">ACTIVE_JOBS:</div>
-                            <div className="text-right">{jobs.length}</div>
+                            <div className="text-right">{jobs.length}{hasMore ? "+" : ""}</div>
                         </div>
 
                         {!user && (
@@ -341,87 +567,26 @@ const App = () => {
                             </div>
                         )}
 
-                        {jobs.map((job) => {
-                            let availability = {};
-                            try {
-                                availability = typeof job.current_availability === 'string'
-                                    ? JSON.parse(job.current_availability)
-                                    : job.current_availability;
-                            } catch (e) { availability = {}; }
-
-                            const isAvailable = availability.status === "TICKETS_AVAILABLE";
-                            const isFew = availability.status === "FEW_TICKETS_LEFT";
-
-                            return (
-                                <div key={job.id} className="border-2 border-black bg-white flex flex-col md:flex-row h-auto md:h-32 transition-transform hover:-translate-y-1 hover:shadow-[4px_4px_0px_0px_rgba(0,0,0,1)]">
-
-                                    {/* STATUS STRIP */}
-                                    <div className={cn(
-                                        "w-full md:w-2 flex-shrink-0 border-b-2 md:border-b-0 md:border-r-2 border-black",
-                                        isAvailable ? "bg-[#FF4500]" : (isFew ? "bg-yellow-400" : "bg-gray-200")
-                                    )}></div>
-
-                                    {/* DATA BLOCK */}
-                                    <div className="flex-1 p-4 flex flex-col justify-between">
-                                        <div className="flex justify-between items-start">
-                                            <div>
-                                                <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Event_Target</div>
-                                                <div className="text-xl font-bold uppercase tracking-tight">{job.eventID}</div>
-                                            </div>
-                                            <div className="flex items-center">
-                                                <div className="font-mono text-[10px] border border-black px-1 pt-[2px] uppercase">
-                                                    {job.mode}
-                                                </div>
-                                                <button
-                                                    onClick={() => handleDelete(job.id)}
-                                                    className="font-mono text-[10px] border border-red-500 text-red-500 hover:bg-red-500 hover:text-white px-2 pt-[2px] uppercase transition-colors ml-2"
-                                                >
-                                                    Archive
-                                                </button>
-                                            </div>
-                                        </div>
-
-                                        <div className="flex gap-8 mt-2">
-                                            <div>
-                                                <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Contact (Email)</div>
-                                                <div className="font-mono text-sm">{job.contact}</div>
-                                            </div>
-                                            <div>
-                                                <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Created</div>
-                                                <div className="font-mono text-sm">
-                                                    {job.createdAt?.seconds ? new Date(job.createdAt.seconds * 1000).toLocaleDateString() : 'Just now'}
-                                                </div>
-                                            </div>
-                                        </div>
-                                    </div>
-
-                                    {/* LIVE METRICS BLOCK */}
-                                    <div className="w-full md:w-64 border-t-2 md:border-t-0 md:border-l-2 border-black bg-[#F9F9F9] p-4 flex flex-col justify-center relative overflow-hidden">
-                                        {/* Background Grid Pattern */}
-                                        <div className="absolute inset-0 opacity-5 pointer-events-none"
-                                            style={{ backgroundImage: 'radial-gradient(circle, #000 1px, transparent 1px)', backgroundSize: '10px 10px' }}>
-                                        </div>
-
-                                        <div className="relative z-10">
-                                            <div className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1">Current Status</div>
-                                            <div className={cn(
-                                                "text-sm font-bold uppercase inline-block border border-black px-2 py-1 mb-2",
-                                                job.status === 'ACTIVE' ? "bg-green-500 text-white" : "bg-red-500 text-white"
-                                            )}>
-                                                {job.status === 'ACTIVE' ? "RUNNING" : "RUN"}
-                                            </div>
-
-                                            <div className="flex justify-between items-end border-t border-gray-300 pt-2">
-                                                <span className="text-[10px] font-bold uppercase text-gray-400">Last Check</span>
-                                                <span className="font-mono text-xs">
-                                                    {availability.last_checked ? new Date(availability.last_checked).toLocaleTimeString([], { hour12: false }) : "--:--:--"}
-                                                </span>
-                                            </div>
-                                        </div>
-                                    </div>
-                                </div>
-                            );
-                        })}
+                        {jobs.length > 0 && (
+                            <VirtualList
+                                items={jobs}
+                                getKey={getJobKey}
+                                renderItem={renderJob}
+                                onEndReached={loadMore}
+                            />
+                        )}
+
+                        {loadingMore && (
+                            <div className="font-mono text-[10px] uppercase text-center text-gray-400">Loading older monitors...</div>
+                        )}
+
+                        {loadMoreError && (
+                            <div className="font-mono text-[10px] uppercase text-center text-[#FF4500]">
+                                Failed to load older monitors.{" "}
+                                {/* Clearing the error hands loading back to the list's end-of-scroll trigger */}
+                                <button onClick={() => setLoadMoreError(null)} className="underline font-bold">Retry</button>
+                            </div>
+                        )}
                     </div>
                 </div>
             </main >
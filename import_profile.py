@@ -0,0 +1,134 @@
+"""
+Cold-start import profiler for the Cloud Function / web entry points.
+
+Runs `python -X importtime` in a fresh interpreter for every entry point: first `import <module>`,
+then the entry point's first-call setup (e.g. `main.get_db()`), which is where the lazily imported
+SDKs are paid for. Module-load cost is reported once per module; each entry point then reports
+what its first call adds. Heavy SDKs imported eagerly at module load are flagged.
+
+Usage:
+    python import_profile.py              # report all entry points
+    python import_profile.py --max-ms 900 # also fail if any entry point's cold start (import + first call) takes longer
+
+Exits with status 1 if a heavy SDK is imported eagerly or a --max-ms budget is exceeded.
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+# Entry point -> (module the runtime imports, first-call setup that runs without network access).
+# The setup pulls in every SDK the handler imports lazily. Credential/initialization errors are
+# ignored, but a missing SDK (ImportError) fails the profile: it would otherwise measure nothing.
+_WORKER_FIRST_CALL = 'get_db(); import requests, smtplib, email.message; from firebase_admin import messaging'
+ENTRY_POINTS = {
+    'ticket_monitor_worker (main.py)': ('main', f'main.{_WORKER_FIRST_CALL}'),
+    'sync_monitor_job (main.py)': ('main', 'main.get_db()'),
+    'compact_monitor_jobs (main.py)': ('main', 'main.get_db()'),
+    'availability_history_downsample (main.py)': ('main', 'main.get_db()'),
+    'ticket_monitor_worker (worker.py)': ('worker', f'worker.{_WORKER_FIRST_CALL}'),
+    'sync_monitor_job (data_sync.py)': ('data_sync', 'data_sync.get_db()'),
+    'index (app.py)': ('app', ''),
+}
+
+# SDKs that must only be imported on first use
+LAZY_MODULES = ('firebase_admin', 'google.cloud', 'grpc', 'requests', 'smtplib')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def profile_entry_point(module, first_call):
+    """
+    Imports `module` and runs `first_call` in a fresh interpreter. Returns
+    ((import_us, import_rows), (first_call_us, first_call_rows)), rows being (self_us, cumulative_us, depth, name).
+    """
+    program = f'import {module}\n'
+    if first_call:
+        program += f'try:\n    {first_call}\nexcept ImportError:\n    raise\nexcept Exception:\n    pass\n'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', program],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error'
+        raise RuntimeError(f"import {module} or its first call failed: {error}")
+
+    # importtime lists children before their parent: the module's own subtree ends at its depth-0 row
+    # (earlier rows are interpreter startup: site, .pth hooks); every row after it came from the first call
+    for index, (_, cumulative_us, depth, name) in enumerate(rows):
+        if depth == 0 and name == module:
+            start = index
+            while start > 0 and rows[start - 1][2] > 0:
+                start -= 1
+            first_call_rows = rows[index + 1:]
+            first_call_us = sum(row[1] for row in first_call_rows if row[2] == 0)
+            return (cumulative_us, rows[start:index + 1]), (first_call_us, first_call_rows)
+    return (0, []), (0, [])
+
+
+def eager_lazy_modules(rows):
+    """Returns the heavy SDK modules (from LAZY_MODULES) that were imported at module load."""
+    found = set()
+    for _, _, _, name in rows:
+        for lazy in LAZY_MODULES:
+            if name == lazy or name.startswith(lazy + '.'):
+                found.add(lazy)
+    return sorted(found)
+
+
+def print_heaviest(rows, top, indent):
+    for self_us, cumulative_us, _, name in sorted(rows, key=lambda row: row[0], reverse=True)[:top]:
+        print(f"{indent}{self_us / 1000:7.1f} ms self  {cumulative_us / 1000:7.1f} ms cumulative  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start import cost per entry point.")
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="Fail if any entry point's cold start (module import + first call) takes longer.")
+    parser.add_argument('--top', type=int, default=5, help="Number of heaviest imports to list per module and first call.")
+    args = parser.parse_args()
+
+    failed = False
+    # Module-load rows are identical for entry points sharing a module, so each module is reported once
+    reported_modules = {}
+    for entry_point, (module, first_call) in ENTRY_POINTS.items():
+        try:
+            (import_us, import_rows), (first_call_us, first_call_rows) = profile_entry_point(module, first_call)
+        except RuntimeError as e:
+            print(f"{entry_point}: ERROR {e}")
+            failed = True
+            continue
+
+        if module not in reported_modules:
+            reported_modules[module] = import_us
+            print(f"{module}: {import_us / 1000:.1f} ms to import ({len(import_rows)} modules)")
+            print_heaviest(import_rows, args.top, '    ')
+            eager = eager_lazy_modules(import_rows)
+            if eager:
+                print(f"    FAIL: heavy SDK(s) imported eagerly: {', '.join(eager)}")
+                failed = True
+        import_us = reported_modules[module]
+
+        total_ms = (import_us + first_call_us) / 1000
+        print(f"  {entry_point}: +{first_call_us / 1000:.1f} ms on first call ({len(first_call_rows)} modules), "
+              f"{total_ms:.1f} ms cold start")
+        print_heaviest(first_call_rows, args.top, '      ')
+        if args.max_ms is not None and total_ms > args.max_ms:
+            print(f"      FAIL: cold start exceeds budget of {args.max_ms:.0f} ms")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
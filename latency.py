@@ -0,0 +1,169 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# --- Latency-Aware Timeout Configuration ---
+# Number of recent upstream call durations kept for the rolling distribution
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "500"))
+# Until this many samples exist, requests use MAX_TIMEOUT_SECONDS and are never hedged
+LATENCY_MIN_SAMPLES = int(os.getenv("LATENCY_MIN_SAMPLES", "20"))
+# Per-request timeout = p99 x factor, clamped to [MIN_TIMEOUT_SECONDS, MAX_TIMEOUT_SECONDS]
+TIMEOUT_P99_FACTOR = float(os.getenv("TIMEOUT_P99_FACTOR", "3.0"))
+MIN_TIMEOUT_SECONDS = float(os.getenv("MIN_TIMEOUT_SECONDS", "1.0"))
+MAX_TIMEOUT_SECONDS = float(os.getenv("MAX_TIMEOUT_SECONDS", "15"))
+# If more than this fraction of recent calls timed out, the upstream has genuinely slowed: use MAX_TIMEOUT_SECONDS
+TIMEOUT_RATE_FALLBACK = float(os.getenv("TIMEOUT_RATE_FALLBACK", "0.25"))
+
+# --- Hedged Request Configuration ---
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+# Every request earns this fraction of a hedge; unused credit is capped at HEDGE_BUDGET_BURST hedges
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.05"))
+HEDGE_BUDGET_BURST = int(os.getenv("HEDGE_BUDGET_BURST", "2"))
+
+
+class LatencyTracker:
+    """
+    Thread-safe rolling window of upstream call durations (seconds).
+
+    Timed-out calls are censored: their true duration is unknown, so they are counted in a
+    separate window of outcomes (the timeout rate) rather than in the percentiles. Otherwise a
+    few stuck connections would become the p99 and ratchet the timeout up by the factor each time.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW, min_samples=LATENCY_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._timed_out = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._timed_out.append(False)
+
+    def record_timeout(self):
+        with self._lock:
+            self._timed_out.append(True)
+
+    def timeout_rate(self):
+        """Fraction of recent calls that timed out, or None until min_samples calls have been seen."""
+        with self._lock:
+            if len(self._timed_out) < self.min_samples:
+                return None
+            return sum(self._timed_out) / len(self._timed_out)
+
+    def percentile(self, pct):
+        """Returns the pct-th percentile (nearest-rank), or None until min_samples have been recorded."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def timeout(self):
+        """Per-request timeout derived from the observed p99."""
+        p99 = self.percentile(99)
+        if p99 is None:
+            return MAX_TIMEOUT_SECONDS
+        timeout_rate = self.timeout_rate()
+        if timeout_rate is not None and timeout_rate > TIMEOUT_RATE_FALLBACK:
+            # Completed calls no longer describe the upstream; back off to the fixed ceiling until it recovers
+            return MAX_TIMEOUT_SECONDS
+        return min(MAX_TIMEOUT_SECONDS, max(MIN_TIMEOUT_SECONDS, p99 * TIMEOUT_P99_FACTOR))
+
+    def hedge_delay(self):
+        """How long to wait on the primary request before hedging (the observed p95), or None."""
+        return self.percentile(95)
+
+
+class HedgeBudget:
+    """
+    Token bucket allowing roughly `ratio` of requests to be hedged. Each request adds `ratio`
+    tokens, capped at `burst`, so a long quiet stretch on a warm instance never banks more than
+    `burst` back-to-back hedges.
+    """
+
+    def __init__(self, ratio=HEDGE_BUDGET_RATIO, burst=HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+
+    def note_request(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+# Module-level so the distribution and budget persist across warm invocations
+upstream_latency = LatencyTracker()
+hedge_budget = HedgeBudget()
+_executor = None
+
+
+def get_executor():
+    """Returns the shared thread pool used for hedged requests, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="upstream")
+    return _executor
+
+
+def _timed_get(session, url, timeout, **kwargs):
+    from requests.exceptions import Timeout
+
+    started = time.monotonic()
+    try:
+        response = session.get(url, timeout=timeout, **kwargs)
+    except Timeout:
+        # Censored sample: counted towards the timeout rate, never fed into the p99
+        upstream_latency.record_timeout()
+        raise
+    upstream_latency.record(time.monotonic() - started)
+    return response
+
+
+def hedged_get(session, url, **kwargs):
+    """
+    GET with a timeout derived from the rolling latency distribution. If the primary request is
+    still pending after the observed p95 and the global hedge budget allows, a second (hedged)
+    request is issued on a fresh session with the same proxies; the first response wins.
+    """
+    timeout = upstream_latency.timeout()
+    hedge_delay = upstream_latency.hedge_delay() if HEDGE_ENABLED else None
+    hedge_budget.note_request()
+
+    if hedge_delay is None:
+        return _timed_get(session, url, timeout, **kwargs)
+
+    executor = get_executor()
+    primary = executor.submit(_timed_get, session, url, timeout, **kwargs)
+    done, _ = wait([primary], timeout=hedge_delay)
+    if done or not hedge_budget.try_spend():
+        return primary.result()
+
+    print(f"Primary request exceeded p95 ({hedge_delay:.2f}s); issuing hedged request.")
+    import requests
+
+    hedge_session = requests.Session()
+    hedge_session.proxies = dict(session.proxies)
+    hedge = executor.submit(_timed_get, hedge_session, url, timeout, **kwargs)
+
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        if not pending:
+            # Both failed: surface the failure
+            return done.pop().result()
@@ -0,0 +1,180 @@
+import os
+import json
+import math
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+
+# --- Fair Scan Scheduling Configuration ---
+# Maximum number of inventory polls per worker run across ALL users (0 = unlimited)
+SCAN_POLL_BUDGET = int(os.getenv("SCAN_POLL_BUDGET", "0"))
+# Maximum number of inventory polls per user per worker run (0 = unlimited)
+USER_POLL_QUOTA = int(os.getenv("USER_POLL_QUOTA", "0"))
+# Optional JSON map of userId -> weight, e.g. '{"abc123": 3}'. Users default to weight 1.
+USER_POLL_WEIGHTS = os.getenv("USER_POLL_WEIGHTS", "")
+
+UNKNOWN_USER = "_unknown"
+# Maintenance document (in compaction.MAINTENANCE_COLLECTION) holding the rotation state between runs
+ROTATION_DOCUMENT = "scan_rotation"
+
+
+def extract_user_id(job_data):
+    """
+    Returns the userId encoded in a synced job's original_source_path.
+
+    Path format: artifacts/{appId}/users/{userId}/ticket_monitors/{documentId}
+    """
+    source_path = job_data.get('original_source_path') or ''
+    parts = source_path.split('/')
+    try:
+        user_id = parts[parts.index('users') + 1]
+    except (ValueError, IndexError):
+        return UNKNOWN_USER
+    return user_id or UNKNOWN_USER
+
+
+def parse_weights(raw_weights):
+    """Parses the USER_POLL_WEIGHTS JSON map, ignoring malformed or non-positive entries."""
+    if not raw_weights:
+        return {}
+    try:
+        weights = json.loads(raw_weights)
+    except ValueError as e:
+        print(f"WARNING: Ignoring malformed USER_POLL_WEIGHTS: {e}")
+        return {}
+    if not isinstance(weights, dict):
+        print("WARNING: Ignoring USER_POLL_WEIGHTS: expected a JSON object of userId -> weight.")
+        return {}
+    parsed = {}
+    for user_id, weight in weights.items():
+        try:
+            weight = int(weight)
+        except (TypeError, ValueError):
+            continue
+        if weight > 0:
+            parsed[str(user_id)] = weight
+    return parsed
+
+
+class FairScanScheduler:
+    """
+    Orders the jobs of a single worker run so that no single user can consume the scan budget.
+
+    Jobs are grouped into per-user queues (keyed on the userId in original_source_path), each
+    queue in document-ID order. Queues are then interleaved with weighted round-robin: every
+    round, a user with weight W gets up to W polls, until their per-user quota or the global
+    scan budget is exhausted.
+
+    Rotation between runs is carried by `rotation` (see rotation_state), kept in ONE maintenance
+    document rather than on the jobs, so it costs at most one write per scan. A user whose queue
+    was cut short resumes after the last job polled for them, wrapping around; a user with N jobs
+    and an effective quota Q therefore sees every job polled within ceil(N / Q) runs, as long as
+    the global scan budget is not exhausted first. When it is, the next run starts with the user
+    whose turn it ran out on.
+    """
+
+    def __init__(self, scan_budget=None, user_quota=None, user_weights=None, rotation=None):
+        self.scan_budget = SCAN_POLL_BUDGET if scan_budget is None else scan_budget
+        self.user_quota = USER_POLL_QUOTA if user_quota is None else user_quota
+        self.user_weights = parse_weights(USER_POLL_WEIGHTS) if user_weights is None else user_weights
+        rotation = rotation or {}
+        self._cursors = dict(rotation.get('cursors') or {})
+        self._next_user = rotation.get('next_user')
+        self._queues = {}
+        self._last_polled = {}
+        self._cut_short = set()
+        self._stopped_at_user = None
+
+    def add(self, job_doc, job_data):
+        """Queues a job snapshot (and its already-decoded data) under its owner's queue."""
+        user_id = extract_user_id(job_data)
+        self._queues.setdefault(user_id, []).append((job_doc, job_data))
+
+    def weight_of(self, user_id):
+        return self.user_weights.get(user_id, 1)
+
+    def quota_of(self, user_id):
+        """Per-user poll quota for this run, scaled by the user's weight (None = unlimited)."""
+        if self.user_quota <= 0:
+            return None
+        return self.user_quota * self.weight_of(user_id)
+
+    def _ordered_queues(self):
+        # Users from next_user onwards (wrapping), each user's jobs from just after their cursor (wrapping)
+        user_ids = sorted(self._queues)
+        if self._next_user is not None:
+            split = bisect_left(user_ids, self._next_user)
+            user_ids = user_ids[split:] + user_ids[:split]
+
+        queues = OrderedDict()
+        for user_id in user_ids:
+            entries = sorted(self._queues[user_id], key=lambda entry: entry[0].id)
+            cursor = self._cursors.get(user_id)
+            if cursor is not None:
+                split = bisect_right([job_doc.id for job_doc, _ in entries], cursor)
+                entries = entries[split:] + entries[:split]
+            queues[user_id] = deque(entries)
+        return queues
+
+    def schedule(self):
+        """
+        Yields (job_doc, job_data) pairs in weighted round-robin order, honouring the per-user
+        quota and the global scan budget.
+        """
+        queues = self._ordered_queues()
+        polled = {user_id: 0 for user_id in queues}
+        total = 0
+        self._last_polled = {}
+        self._cut_short = set()
+        self._stopped_at_user = None
+
+        while queues:
+            for user_id in list(queues):
+                queue = queues[user_id]
+                quota = self.quota_of(user_id)
+
+                for _ in range(self.weight_of(user_id)):
+                    if not queue or (quota is not None and polled[user_id] >= quota):
+                        break
+                    if self.scan_budget > 0 and total >= self.scan_budget:
+                        # Every user still queued has unpolled jobs; the next run starts with this one
+                        self._cut_short.update(queues)
+                        self._stopped_at_user = user_id
+                        return
+                    job_doc, job_data = queue.popleft()
+                    polled[user_id] += 1
+                    total += 1
+                    self._last_polled[user_id] = job_doc.id
+                    yield job_doc, job_data
+
+                if not queue or (quota is not None and polled[user_id] >= quota):
+                    if queue:
+                        self._cut_short.add(user_id)
+                    del queues[user_id]
+
+    def rotation_state(self):
+        """
+        Returns the rotation to persist once schedule() has been consumed: a cursor (last polled
+        job ID) for every user whose queue was cut short, and the user to start the next run with
+        if the scan budget ran out. Users polled in full start from the beginning next run.
+        """
+        cursors = {}
+        for user_id in self._cut_short:
+            cursor = self._last_polled.get(user_id, self._cursors.get(user_id))
+            if cursor is not None:
+                cursors[user_id] = cursor
+        return {'cursors': cursors, 'next_user': self._stopped_at_user}
+
+    def summary(self):
+        """Returns human-readable per-user lines describing this run's share and rotation bound."""
+        lines = []
+        for user_id, entries in self._queues.items():
+            queued = len(entries)
+            quota = self.quota_of(user_id)
+            if quota is None or quota >= queued:
+                lines.append(f"User {user_id[:8]}...: {queued} job(s), all polled every run.")
+            else:
+                lines.append(
+                    f"User {user_id[:8]}...: {queued} job(s), quota {quota}/run, "
+                    f"every job polled at least once per {math.ceil(queued / quota)} run(s) within the scan budget."
+                )
+        return lines
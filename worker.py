@@ -1,26 +1,46 @@
 import os
 import json
-import requests
-import smtplib
-from email.message import EmailMessage
+import time
 from datetime import datetime, timezone
 import random
-from requests.exceptions import ProxyError, Timeout, HTTPError
+
+from scheduler import FairScanScheduler, ROTATION_DOCUMENT
+from availability_history import AvailabilityHistory, downsample_history
+from compaction import (
+    acquire_lease, renew_lease, release_lease, compact_jobs,
+    MAINTENANCE_COLLECTION, SCAN_LEASE_SECONDS, SCAN_LEASE_RENEW_SECONDS,
+)
+from latency import hedged_get
 
 # --- Google Cloud Firestore and Firebase Admin SDK Setup ---
-from firebase_admin import initialize_app, firestore, messaging # ADDED: messaging
-from google.cloud.exceptions import NotFound
-
-try:
-    # Initializes the Firebase Admin SDK using Application Default Credentials (GCP's Service Account)
-    initialize_app()
-    db = firestore.client()
-except Exception as e:
-    # Handle the common case where the script is run outside GCP credentials context
-    print(f"Warning: Firestore Admin SDK initialization skipped/failed outside GCP: {e}")
-    db = None
+# Heavy SDKs (firebase_admin, requests, smtplib) are imported on first use, not at module import,
+# so entry points that never touch them don't pay for them on cold start.
+_db = None
+
+
+def get_db():
+    """Returns the cached Firestore client, importing and initializing the Firebase Admin SDK on first use."""
+    global _db
+    if _db is None:
+        # A missing SDK is a deployment error, not an environment quirk: let the ImportError surface
+        import firebase_admin
+        from firebase_admin import firestore
+        try:
+            try:
+                firebase_admin.get_app()
+            except ValueError:
+                # Initializes the Firebase Admin SDK using Application Default Credentials (GCP's Service Account)
+                firebase_admin.initialize_app()
+            _db = firestore.client()
+        except Exception as e:
+            # Handle the common case where the script is run outside GCP credentials context
+            print(f"Warning: Firestore Admin SDK initialization skipped/failed outside GCP: {e}")
+    return _db
+
 
 # --- Configuration & Environment Variables ---
+# Seconds a scan waits for an in-flight compaction page to finish before giving up
+SCAN_LEASE_WAIT_SECONDS = int(os.getenv("SCAN_LEASE_WAIT_SECONDS", "90"))
 TICKETMASTER_API_KEY = os.getenv("TICKETMASTER_API_KEY", "YOUR_TICKETMASTER_API_KEY")
 MOCK_ROOT_COLLECTION = os.getenv("MOCK_ROOT_COLLECTION", "worker_monitor_jobs")
 
@@ -28,6 +48,9 @@ MOCK_ROOT_COLLECTION = os.getenv("MOCK_ROOT_COLLECTION", "worker_monitor_jobs")
 GMAIL_USER = os.getenv("GMAIL_USER")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
 
+# Firestore allows at most 500 writes per batch
+FIRESTORE_BATCH_LIMIT = 500
+
 # Proxy Configuration
 PROXY_URL = os.getenv("PROXY_URL")
 
@@ -38,65 +61,121 @@ TM_QUEUE_TOKEN = os.getenv("TM_QUEUE_TOKEN")
 # Target API Endpoint: Using the general Inventory Status URL but requiring the specific tokens/headers
 TM_API_ENDPOINT = "https://app.ticketmaster.com/inventory-status/v1/availability"
 
+# Append-only availability history, buffered during the scan and flushed in blocks
+history = AvailabilityHistory()
+
 # --- Notification Utility ---
-def send_notification(job_id, contact_email, fcm_token, event_id, status, price_min, price_max):
-    """Sends Gmail notification and FCM push notification."""
-    
-    price_range_str = f"($USD {price_min} - $USD {price_max})" if price_min else "(Price Unknown)"
-    
-    notification_content = (
-        f"🚨 TICKET ALERT! 🚨\n"
-        f"Event {event_id} status changed to: {status.replace('_', ' ')}.\n"
-        f"Price Range: {price_range_str}\n"
-        f"Buy Now: [Check Ticketmaster app/site]"
-    )
-
-    # --- 1. GMAIL (SMTP) Notification ---
-    if GMAIL_USER and GMAIL_APP_PASSWORD and contact_email:
-        msg = EmailMessage()
-        msg.set_content(notification_content)
-        msg['Subject'] = f"🚨 TICKET ALERT: Tickets Available for {event_id}"
-        msg['From'] = GMAIL_USER
-        msg['To'] = contact_email
+def format_price_range(price_min, price_max):
+    return f"($USD {price_min} - $USD {price_max})" if price_min else "(Price Unknown)"
 
-        try:
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
-                server.send_message(msg)
-            print(f"Gmail notification sent to {contact_email} for job {job_id[:8]}...")
-        except Exception as e:
-            print(f"ERROR sending Gmail email to {contact_email}: {e}")
-            if not GMAIL_APP_PASSWORD:
-                 print("NOTE: Ensure GMAIL_APP_PASSWORD is correctly set as an App Password, not your main password.")
-    else:
-        print(f"--- MOCK EMAIL NOTIFICATION SENT ---\nTarget: {contact_email}\n{notification_content}\n-------------------------")
+
+def group_alerts(alerts, key):
+    """Groups triggered alerts by a recipient field (e.g. 'contact_email' or 'fcm_token'), preserving scan order."""
+    groups = {}
+    for alert in alerts:
+        recipient = alert.get(key)
+        if recipient:
+            groups.setdefault(recipient, []).append(alert)
+    return groups
+
+
+def build_digest_content(alerts):
+    """Builds the plain-text digest body listing every triggered event with its price range."""
+    lines = ["🚨 TICKET ALERT! 🚨", f"{len(alerts)} monitored event(s) just went on sale:", ""]
+    for alert in alerts:
+        lines.append(
+            f"- Event {alert['event_id']}: {alert['status'].replace('_', ' ')} "
+            f"{format_price_range(alert['price_min'], alert['price_max'])}"
+        )
+    lines.extend(["", "Buy Now: [Check Ticketmaster app/site]"])
+    return "\n".join(lines)
+
+
+def send_email_digests(alerts):
+    """Sends one Gmail digest per contact email, reusing a single SMTP session for the whole scan."""
+    email_groups = group_alerts(alerts, 'contact_email')
+    if not email_groups:
+        return
+
+    if not (GMAIL_USER and GMAIL_APP_PASSWORD):
+        for contact_email, contact_alerts in email_groups.items():
+            print(f"--- MOCK EMAIL NOTIFICATION SENT ---\nTarget: {contact_email}\n{build_digest_content(contact_alerts)}\n-------------------------")
         if not GMAIL_USER:
             print("NOTE: Gmail credentials not configured. Set GMAIL_USER/GMAIL_APP_PASSWORD environment variables for real email.")
+        return
 
+    import smtplib
+    from email.message import EmailMessage
 
-    # --- 2. FCM (Firebase Cloud Messaging) Push Notification ---
-    if fcm_token:
+    try:
+        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
+            server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
+            for contact_email, contact_alerts in email_groups.items():
+                event_ids = ", ".join(alert['event_id'] for alert in contact_alerts)
+                msg = EmailMessage()
+                msg.set_content(build_digest_content(contact_alerts))
+                msg['Subject'] = f"🚨 TICKET ALERT: Tickets Available for {event_ids}"
+                msg['From'] = GMAIL_USER
+                msg['To'] = contact_email
+                try:
+                    server.send_message(msg)
+                    print(f"Gmail digest sent to {contact_email} for {len(contact_alerts)} job(s).")
+                except Exception as e:
+                    print(f"ERROR sending Gmail digest to {contact_email}: {e}")
+    except Exception as e:
+        print(f"ERROR opening Gmail SMTP session: {e}")
+        print("NOTE: Ensure GMAIL_APP_PASSWORD is correctly set as an App Password, not your main password.")
+
+
+def send_push_digests(alerts):
+    """Sends one FCM push notification per device token summarising all of its triggered events."""
+    groups = group_alerts(alerts, 'fcm_token')
+    if not groups:
+        return
+    from firebase_admin import messaging
+
+    for fcm_token, token_alerts in groups.items():
+        event_ids = ", ".join(alert['event_id'] for alert in token_alerts)
+        if len(token_alerts) == 1:
+            alert = token_alerts[0]
+            body = f"Status: {alert['status'].replace('_', ' ')}. Price: {format_price_range(alert['price_min'], alert['price_max'])}"
+        else:
+            body = "; ".join(
+                f"{alert['event_id']} {format_price_range(alert['price_min'], alert['price_max'])}"
+                for alert in token_alerts
+            )
         try:
-            # Construct the push notification payload
+            # Construct the push notification payload (FCM data values must be strings)
             message = messaging.Message(
                 notification=messaging.Notification(
-                    title=f"🚨 TICKET ALERT: {event_id} 🚨",
-                    body=f"Status: {status.replace('_', ' ')}. Price: {price_range_str}"
+                    title=f"🚨 TICKET ALERT: {event_ids} 🚨",
+                    body=body
                 ),
                 data={
-                    'jobId': job_id,
-                    'eventId': event_id,
+                    'jobIds': ",".join(alert['job_id'] for alert in token_alerts),
+                    'eventIds': ",".join(alert['event_id'] for alert in token_alerts),
                 },
                 token=fcm_token,
             )
             # Send the message
             response = messaging.send(message)
-            print(f"FCM Push notification sent successfully for job {job_id[:8]}...: {response}")
+            print(f"FCM Push digest sent successfully for {len(token_alerts)} job(s): {response}")
         except Exception as e:
             print(f"ERROR sending FCM push notification: {e}")
             print("NOTE: FCM requires the device to have the app installed, token saved to Firestore, and proper IAM permissions.")
 
 
+def send_notification_digests(alerts):
+    """
+    Sends Gmail and FCM notifications for every job triggered in a scan, coalesced so each
+    contact email and each FCM token receives exactly one digest message.
+    """
+    if not alerts:
+        return
+    send_email_digests(alerts)
+    send_push_digests(alerts)
+
+
 # --- Critical Polling Logic (No changes needed here for functionality) ---
 # ... (check_event_status remains the same)
 def check_event_status(event_id):
@@ -104,7 +183,6 @@ def check_event_status(event_id):
     Hardened check of the Ticketmaster inventory status using session tokens and proxy.
     """
     now = datetime.now(timezone.utc).isoformat()
-    session = requests.Session()
     
     # --- MOCK LOGIC: If keys are missing or development ---
     if TICKETMASTER_API_KEY == "YOUR_TICKETMASTER_API_KEY":
@@ -131,6 +209,10 @@ def check_event_status(event_id):
         }
 
     # --- REAL HARDENED API CALL ---
+    import requests
+    from requests.exceptions import ProxyError, HTTPError
+
+    session = requests.Session()
 
     # 1. Proxy Implementation
     if PROXY_URL:
@@ -160,7 +242,8 @@ def check_event_status(event_id):
     
     response = None
     try:
-        response = session.get(TM_API_ENDPOINT, params=params, headers=headers, timeout=15)
+        # Timeout derived from the rolling upstream latency (p99 x factor), hedged past p95
+        response = hedged_get(session, TM_API_ENDPOINT, params=params, headers=headers)
         
         # 4. Error Handling Checks (Required per prompt)
         
@@ -209,11 +292,20 @@ def check_event_status(event_id):
         return 'UNKNOWN_ERROR', {"status": "UNKNOWN_ERROR", "last_checked": now}
 
 
+def flush_history(db):
+    try:
+        history.flush(db)
+    except Exception as e:
+        # History is best-effort analytics; samples stay buffered for the next flush
+        print(f"WARNING: Failed to flush availability history: {e}")
+
+
 # --- Cloud Function Entry Point ---
 def ticket_monitor_worker(request=None):
     """
     Main entry point for the scheduled Cloud Function.
     """
+    db = get_db()
     if db is None:
         return "Worker not initialized. Check Firestore Admin SDK setup and environment.", 500
         
@@ -225,25 +317,57 @@ def ticket_monitor_worker(request=None):
     if not TM_QUEUE_TOKEN:
          print("WARNING: TM_QUEUE_TOKEN is missing. Worker may be redirected to the queue (302).")
     
+    lease_token = None
     try:
+        # Never overlap with compaction: wait out any in-flight compaction page, then hold the lease for the whole scan
+        lease_token = acquire_lease(db, 'scan', SCAN_LEASE_SECONDS, wait_seconds=SCAN_LEASE_WAIT_SECONDS, priority=True)
+        if lease_token is None:
+            print("WARNING: Worker lease is held (another scan or compaction). Skipping this run.")
+            return "Worker lease busy; scan skipped.", 503
+
+        from firebase_admin.firestore import SERVER_TIMESTAMP
+
         jobs_ref = db.collection(MOCK_ROOT_COLLECTION).where('status', '==', 'ACTIVE')
         jobs_stream = jobs_ref.stream()
         
-        jobs_to_update = []
-        
+        # Build per-user queues so one user with many monitors cannot take the whole scan budget,
+        # resuming the rotation where the previous run left it
+        rotation_ref = db.collection(MAINTENANCE_COLLECTION).document(ROTATION_DOCUMENT)
+        rotation_snapshot = rotation_ref.get()
+        rotation = rotation_snapshot.to_dict() if rotation_snapshot.exists else {}
+        scheduler = FairScanScheduler(rotation=rotation)
         for job_doc in jobs_stream:
             job_data = job_doc.to_dict()
+            # Invalid jobs are dropped before scheduling so they never consume a user's quota or the scan budget
+            if not job_data.get('eventID') or not job_data.get('contact'):
+                print(f"Skipping job {job_doc.id[:8]}...: Missing eventID or contact (email).")
+                continue
+            scheduler.add(job_doc, job_data)
+        for line in scheduler.summary():
+            print(line)
+        
+        jobs_to_update = []
+        triggered_alerts = []
+        lease_renew_at = time.time() + SCAN_LEASE_RENEW_SECONDS
+        
+        for job_doc, job_data in scheduler.schedule():
+            # Keep the lease alive however long the scan runs, so compaction can never start mid-scan
+            if time.time() >= lease_renew_at:
+                if not renew_lease(db, lease_token, SCAN_LEASE_SECONDS):
+                    print("WARNING: Worker lease lost mid-scan. Discarding this run's results.")
+                    return "Worker lease lost; scan aborted.", 503
+                lease_renew_at = time.time() + SCAN_LEASE_RENEW_SECONDS
+
             job_id = job_doc.id
             event_id = job_data.get('eventID')
             contact_email = job_data.get('contact') # Renamed variable to reflect content change
             fcm_token = job_data.get('fcm_token') # ASSUME FCM token is stored in the document
-            
-            if not event_id or not contact_email:
-                print(f"Skipping job {job_id[:8]}...: Missing eventID or contact (email).")
-                continue
 
             # 1. Check current availability
             new_status_key, new_availability_data = check_event_status(event_id)
+            history.record(job_id, new_availability_data)
+            if history.is_due():
+                flush_history(db)
             
             # 2. Parse the previous status for comparison
             previous_status_key = 'UNKNOWN'
@@ -270,18 +394,19 @@ def ticket_monitor_worker(request=None):
             }
             
             if is_newly_available:
-                send_notification(
-                    job_id, 
-                    contact_email, # Now passing email
-                    fcm_token,     # Now passing FCM token
-                    event_id, 
-                    new_status_key, 
-                    new_availability_data.get('priceMin'), 
-                    new_availability_data.get('priceMax')
-                )
+                # Queue the alert; notifications are coalesced per recipient after the scan
+                triggered_alerts.append({
+                    'job_id': job_id,
+                    'contact_email': contact_email,
+                    'fcm_token': fcm_token,
+                    'event_id': event_id,
+                    'status': new_status_key,
+                    'price_min': new_availability_data.get('priceMin'),
+                    'price_max': new_availability_data.get('priceMax'),
+                })
                 
                 update_data['status'] = 'COMPLETE' 
-                update_data['notificationSentAt'] = firestore.SERVER_TIMESTAMP
+                update_data['notificationSentAt'] = SERVER_TIMESTAMP
                 print(f"Job {job_id[:8]}... TRIGGERED notification and marked COMPLETE.")
             
             if needs_status_update:
@@ -291,20 +416,80 @@ def ticket_monitor_worker(request=None):
                 print(f"Job {job_id[:8]}... checked. Status is still {new_status_key}.")
 
 
+        # Renew once more so notifications and writes run under a full lease, never after compaction resumed
+        if not renew_lease(db, lease_token, SCAN_LEASE_SECONDS):
+            print("WARNING: Worker lease lost before writing results. Discarding this run's results.")
+            return "Worker lease lost; scan aborted.", 503
+
+        # One digest per contact email / FCM token, however many of their jobs triggered
+        send_notification_digests(triggered_alerts)
+
         # Batch apply updates to Firestore for efficiency
         if jobs_to_update:
-            batch = db.batch()
-            for job_id, update_data in jobs_to_update:
-                job_ref = db.collection(MOCK_ROOT_COLLECTION).document(job_id)
-                batch.update(job_ref, update_data)
-            
-            batch.commit()
+            for start in range(0, len(jobs_to_update), FIRESTORE_BATCH_LIMIT):
+                batch = db.batch()
+                for job_id, update_data in jobs_to_update[start:start + FIRESTORE_BATCH_LIMIT]:
+                    job_ref = db.collection(MOCK_ROOT_COLLECTION).document(job_id)
+                    batch.update(job_ref, update_data)
+                batch.commit()
             print(f"Batch update completed for {len(jobs_to_update)} jobs.")
         else:
             print("No jobs required batch update.")
 
+        # One write per scan for the whole rotation, and none at all while it is unchanged
+        rotation_state = scheduler.rotation_state()
+        if rotation_state != rotation:
+            rotation_ref.set(rotation_state)
+
+        # One history block per scan: samples never wait on the instance staying warm
+        flush_history(db)
+
         return "Ticket monitor worker run successful.", 200
 
     except Exception as e:
         print(f"Critical error in worker: {e}")
-        return f"Critical error in worker: {e}", 500
\ No newline at end of file
+        return f"Critical error in worker: {e}", 500
+
+    finally:
+        try:
+            release_lease(db, lease_token)
+        except Exception as e:
+            # The lease expires on its own after SCAN_LEASE_SECONDS
+            print(f"WARNING: Failed to release worker lease: {e}")
+
+
+# --- Compaction Entry Point ---
+def compact_monitor_jobs(request=None):
+    """
+    Entry point for a scheduled Cloud Function that moves COMPLETE, stale and user-archived
+    jobs out of the hot worker collection. Resumable: schedule it repeatedly until it reports done.
+    """
+    db = get_db()
+    if db is None:
+        return "Worker not initialized. Check Firestore Admin SDK setup and environment.", 500
+
+    try:
+        if compact_jobs(db):
+            return "Compaction complete.", 200
+        return "Compaction paused; it will resume on the next run.", 200
+    except Exception as e:
+        print(f"Critical error in compaction: {e}")
+        return f"Critical error in compaction: {e}", 500
+
+
+# --- History Downsampling Entry Point ---
+def availability_history_downsample(request=None):
+    """
+    Entry point for a (daily) scheduled Cloud Function that merges old raw history blocks
+    into coarser per-day blocks.
+    """
+    db = get_db()
+    if db is None:
+        return "Worker not initialized. Check Firestore Admin SDK setup and environment.", 500
+
+    try:
+        downsample_history(db)
+        return "Availability history downsampling successful.", 200
+    except Exception as e:
+        print(f"Critical error in history downsampling: {e}")
+        return f"Critical error in history downsampling: {e}", 500
\ No newline at end of file